@@ -1,10 +1,13 @@
 import logging
 import os
+import queue
 import signal
 import subprocess
 import threading
 import time
 import traceback
+import xmlrpc.client
+from collections import OrderedDict
 from enum import Enum
 from typing import Any
 from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
@@ -305,10 +308,78 @@ class TaskManager:
             self.status = StatusCode.COMPLETED
 
 
+# Controller RPC methods called when a task reaches a given status
+NOTIFICATIONS = {
+    StatusCode.COMPLETED: "task_complete",
+    StatusCode.FAILED: "task_failed",
+    StatusCode.KILLED: "task_killed",
+    StatusCode.STOPPED: "task_stopped",
+}
+
+
 class Engine:
-    def __init__(self, executables_folder):
+    def __init__(self, executables_folder, wakeup=None, controller_address=None):
+        """Engine that launches tasks and tracks their status.
+
+        Parameters:
+        executables_folder: str
+            Path to the folder where executables are stored
+        wakeup: multiprocessing.Event
+            Optional event set whenever a task exits, so that the controller
+            can reuse the freed resources immediately.
+        controller_address: str
+            Optional address of the controller RPC server. When given, the
+            engine notifies the controller as soon as a task exits, is killed
+            or is stopped.
+        """
         self.tasks = []
+        self.task_index = {}
         self.executables_folder = executables_folder
+        self.wakeup = wakeup
+
+        # Sequence number of the last status change, and the sequence number
+        # of the last change of each task, ordered by sequence number.
+        self.seq = 0
+        self.changes = OrderedDict()
+        self.lock = threading.RLock()
+
+        self.controller_address = controller_address
+        self.notifications = queue.Queue()
+
+    def record_change(self, task):
+        """Record a status change of a task for poll_changes and notify the
+        controller.
+        """
+        self.seq += 1
+        self.changes[task.id] = self.seq
+        self.changes.move_to_end(task.id)
+        if self.controller_address is not None and task.status in NOTIFICATIONS:
+            self.notifications.put((NOTIFICATIONS[task.status], task.id))
+
+    def send_notifications(self):
+        """Send task notifications to the controller. Runs in a thread, so
+        that the main loop is not blocked by the RPC calls. Notifications that
+        fail are dropped, the controller also polls for changes.
+        """
+        controller = xmlrpc.client.ServerProxy(self.controller_address)
+        while True:
+            method, task_id = self.notifications.get()
+            if method is None:
+                break
+            try:
+                getattr(controller, method)(task_id)
+            except Exception as e:
+                logger.info(f"Failed to notify controller: {e}")
+
+    def task_info(self, task):
+        """Return a dictionary describing the task, that can be sent over RPC."""
+        return {
+            "name": task.name,
+            "id": task.id,
+            "status": task.status.name.lower(),
+            "status_reason": task.status_reason if task.status_reason else "none",
+            "pid": task.pid if task.pid else "none",
+        }
 
     def run(self, task, cpu_list):
         """Run a task.
@@ -329,22 +400,28 @@ class Engine:
             logger.info(f"failed to run task {task['name']}")
             traceback.print_exc()
             return None, StatusCode.FAILED_TO_START
-        self.tasks.append(task)
+        with self.lock:
+            self.tasks.append(task)
+            self.task_index[task.id] = task
+            self.record_change(task)
 
-        task_dict = {
-            "name": task.name,
-            "id": task.id,
-            "status": task.status.name.lower(),
-            "status_reason": task.status_reason if task.status_reason else "none",
-            "pid": task.pid if task.pid else "none",
-        }
-        return task_dict
+        return self.task_info(task)
 
     def update(self):
         """Update the status of all tasks"""
         logger.info("updating tasks")
-        for task in self.tasks:
-            task.update_status()
+        task_exited = False
+        with self.lock:
+            for task in self.tasks:
+                status = task.status
+                task.update_status()
+                if task.status != status:
+                    self.record_change(task)
+                    if status == StatusCode.RUNNING:
+                        task_exited = True
+
+        if task_exited and self.wakeup is not None:
+            self.wakeup.set()
 
     def main_loop(self, stop_event):
         """Main loop of the engine"""
@@ -358,29 +435,40 @@ class Engine:
 
     def kill_all(self, reason="killed by signal"):
         """Kill all tasks"""
-        for task in self.tasks:
-            task.kill(reason)
+        with self.lock:
+            for task in self.tasks:
+                task.kill(reason)
+                self.record_change(task)
 
     def stop_all(self):
         """Stop all tasks"""
-        for task in self.tasks:
-            task.stop()
+        with self.lock:
+            for task in self.tasks:
+                status = task.status
+                task.stop()
+                if task.status != status:
+                    self.record_change(task)
 
     def get_task(self, task_id):
         """Get a task by id. RPC cannot return the thread object, so we return
         the PID instead.
         """
-        for task in self.tasks:
-            if task.id == task_id:
-                task_dict = {
-                    "name": task.name,
-                    "id": task.id,
-                    "status": task.status.name.lower(),
-                    "status_reason": task.status_reason,
-                    "pid": task.pid if task.pid else "none",
-                }
-                return task_dict
-        return {}
+        task = self.task_index.get(task_id)
+        if task is None:
+            return {}
+        return self.task_info(task)
+
+    def poll_changes(self, since_seq):
+        """Return the tasks whose status changed after the sequence number
+        since_seq, and the current sequence number to pass in the next call.
+        """
+        with self.lock:
+            tasks = []
+            for task_id, seq in reversed(self.changes.items()):
+                if seq <= since_seq:
+                    break
+                tasks.append(self.task_info(self.task_index[task_id]))
+            return {"seq": self.seq, "tasks": tasks}
 
     def is_running(self):
         return True
@@ -402,8 +490,17 @@ class Engine:
         self.rpc_thread.daemon = True
         self.rpc_thread.start()
 
+        if self.controller_address is not None:
+            self.notification_thread = threading.Thread(
+                target=self.send_notifications, daemon=True
+            )
+            self.notification_thread.start()
+
         self.main_loop(stop_event)
 
+        if self.controller_address is not None:
+            self.notifications.put((None, None))
+
         # wait for the rpc thread to exit
         self.rpc_server.shutdown()
         self.rpc_server.server_close()
@@ -4,43 +4,29 @@ import uvicorn
 from fastapi import FastAPI
 
 from odop.engine.engine import StatusCode
+from odop.scheduler.task_registry import TaskSnapshot
 
 
 def create_app(tasks):
+    """Create the API app.
+
+    Parameters:
+    tasks: dict
+        Task summaries by id, as published by the controller task registry.
+    """
     app = FastAPI()
 
+    def count(status):
+        return len([task for task in list(tasks.values()) if task["status"] == status])
+
     @app.get("/")
     def summary():
         """Return a summary of the task queue."""
         summary = {
-            "running_tasks": len(
-                [
-                    tasks[id]
-                    for id in tasks.keys()
-                    if tasks[id].status == StatusCode.RUNNING
-                ]
-            ),
-            "pending_tasks": len(
-                [
-                    tasks[id]
-                    for id in tasks.keys()
-                    if tasks[id].status == StatusCode.PENDING
-                ]
-            ),
-            "finished_tasks": len(
-                [
-                    tasks[id]
-                    for id in tasks.keys()
-                    if tasks[id].status == StatusCode.COMPLETED
-                ]
-            ),
-            "failed_tasks": len(
-                [
-                    tasks[id]
-                    for id in tasks.keys()
-                    if tasks[id].status == StatusCode.FAILED
-                ]
-            ),
+            "running_tasks": count(StatusCode.RUNNING.value),
+            "pending_tasks": count(StatusCode.PENDING.value),
+            "finished_tasks": count(StatusCode.COMPLETED.value),
+            "failed_tasks": count(StatusCode.FAILED.value),
         }
         return summary
 
@@ -48,14 +34,13 @@ def create_app(tasks):
     def get_status():
         """Return the current status of all tasks."""
         status = []
-        for id in tasks.keys():
-            task = tasks[id]
+        for task in list(tasks.values()):
             status.append(
                 {
-                    "name": task.name,
-                    "task_id": task.task_id,
-                    "index": task.index,
-                    "status": task.status.value,
+                    "name": task["name"],
+                    "task_id": task["task_id"],
+                    "index": task["index"],
+                    "status": task["status"],
                 }
             )
         return status
@@ -63,30 +48,31 @@ def create_app(tasks):
     @app.get("/status/{task_id}")
     def get_task_status(task_id: int):
         """Return information about a given task, provided a task_id."""
-        for id in tasks.keys():
-            task = tasks[id]
-            if task.id == task_id:
-                task_dict = {
-                    "name": task.name,
-                    "task_id": task.task_id,
-                    "index": task.index,
-                    "status": task.status.value,
-                    "pid": task.pid,
-                    "times_failed": task.times_failed,
-                }
-                if hasattr(task, "parameters"):
-                    task_dict["parameters"] = task.parameters
-                if hasattr(task, "start_time"):
-                    task_dict["start_time"] = task.start_time
-                if hasattr(task, "end_time"):
-                    task_dict["end_time"] = task.end_time
-                return task_dict
+        task = tasks.get(task_id)
+        if task is None:
+            return {"error": "Task not found"}
 
-        return {"error": "Task not found"}
+        task_dict = {
+            "name": task["name"],
+            "task_id": task["task_id"],
+            "index": task["index"],
+            "status": task["status"],
+            "pid": task["pid"],
+            "times_failed": task["times_failed"],
+        }
+        for key in ["parameters", "start_time", "end_time"]:
+            if key in task:
+                task_dict[key] = task[key]
+        return task_dict
 
     return app
 
 
-def start_api_server(hostname, port, tasks):
-    app = create_app(tasks)
+def start_api_server(hostname, port, connection):
+    """Start the API server. Task information is received from the
+    controller through the connection.
+    """
+    snapshot = TaskSnapshot(connection)
+    snapshot.start()
+    app = create_app(snapshot.tasks)
     uvicorn.run(app, host=hostname, port=port)
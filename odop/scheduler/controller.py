@@ -1,6 +1,7 @@
 import importlib
 import multiprocessing
 import os
+import queue
 import sys
 import threading
 import time
@@ -15,6 +16,7 @@ from odop.common import create_logger
 from odop.engine.engine import Engine, StatusCode
 from odop.scheduler.algorithms import Algorithm
 from odop.scheduler.api import start_api_server
+from odop.scheduler.task_registry import TaskRegistry
 
 logger = create_logger("controller")
 
@@ -36,8 +38,10 @@ class Controller:
         parameters
         ----------
         """
-        self.manager = multiprocessing.Manager()
-        self.tasks = self.manager.dict()
+        # The task registry is owned by the controller process. Changes are
+        # published to the API process through a pipe.
+        self.api_connection, registry_connection = multiprocessing.Pipe(duplex=False)
+        self.tasks = TaskRegistry(registry_connection)
 
         self.queue = queue
         self.status = status
@@ -56,9 +60,29 @@ class Controller:
         self.excluded_cpus = config.get("excluded_cpus", [])
         self.resubmit_wait_time = config.get("resubmit_wait_time", 60)
 
+        # In event driven mode the scheduling interval is an upper bound. A
+        # cycle starts as soon as a task is queued, a task exits or the number
+        # of free cores changes by at least metrics_wakeup_threshold.
+        self.event_driven = config.get("event_driven", False)
+        self.metrics_interval = config.get("metrics_interval", 0.25)
+        self.metrics_wakeup_threshold = config.get("metrics_wakeup_threshold", 1)
+        self.wakeup = queue.wakeup
+        self.last_free_cpus = None
+
         # Store for monitoring data and task status
         self.monitoring_data = {}
 
+        # Local copy of the task queue, updated with deltas from the queue
+        self.queue_mirror = {}
+        self.queue_version = -1
+
+        # Sequence number of the last engine status change seen
+        self.engine_seq = 0
+
+        # Task status notifications pushed by the engine through the RPC
+        # server. They are applied in the main loop.
+        self.notifications = queue.Queue()
+
     def load_algorithm(self, algorithm):
         """Load the scheduling and assignment algorithm"""
         assert isinstance(algorithm, str)
@@ -128,7 +152,9 @@ class Controller:
         """Returns the available resources based on the last monitoring data."""
         # Check if any task is running on the node
         running_tasks = [
-            task for task in self.tasks.values() if task.status == StatusCode.RUNNING
+            task
+            for task in self.tasks.active_tasks()
+            if task.status == StatusCode.RUNNING
         ]
         node_tasks = [task for task in running_tasks if node in task.execution_nodes]
         node_free = len(node_tasks) > 0
@@ -167,28 +193,101 @@ class Controller:
             if node_resource is not None:
                 resources["nodes"][node] = node_resource
         resources["shared_disk"] = 0
+        self.last_free_cpus = self.count_free_cpus(resources)
         return resources
 
+    def count_free_cpus(self, resources):
+        """Count the free cpus over all nodes in a resource dictionary."""
+        return sum(len(node["cpus"]) for node in resources["nodes"].values())
+
+    def metrics_changed(self):
+        """Check whether the number of free cpus has changed significantly
+        since the last scheduling cycle.
+        """
+        previous = self.last_free_cpus
+        current = self.count_free_cpus(self.resources_available())
+        if previous is None:
+            return True
+        return abs(current - previous) >= self.metrics_wakeup_threshold
+
+    def wait_for_cycle(self, stop_event):
+        """Wait until the next scheduling cycle should start.
+
+        Without event driven scheduling, this simply sleeps for the scheduling
+        interval. Otherwise, return as soon as the wakeup event is set or the
+        monitoring data shows a significant change in free cpus. Metrics are
+        only checked while there are tasks waiting in the queue.
+        """
+        if not self.event_driven:
+            time.sleep(self.scheduling_interval)
+            return
+
+        deadline = time.time() + self.scheduling_interval
+        while not stop_event.is_set():
+            timeout = min(self.metrics_interval, deadline - time.time())
+            if timeout <= 0:
+                return
+            if self.wakeup.wait(timeout):
+                self.wakeup.clear()
+                return
+            if len(self.queue) > 0 and self.metrics_changed():
+                return
+
+    def sync_queue(self):
+        """Update the local copy of the task queue with the changes since
+        the last cycle and return it.
+        """
+        changes = self.queue.changes_since(self.queue_version)
+        if changes["reset"]:
+            self.queue_mirror = {}
+        for task_id in changes["removed"]:
+            self.queue_mirror.pop(task_id, None)
+        self.queue_mirror.update(changes["added"])
+        self.queue_mirror.update(changes["updated"])
+        self.queue_version = changes["version"]
+        return self.queue_mirror
+
+    def update_task_status(self, task_id, status):
+        """Apply a status reported by the engine to a running or stopped task."""
+        task = self.tasks.get(task_id)
+        if task is None or task.status not in (StatusCode.RUNNING, StatusCode.STOPPED):
+            return
+        if status == task.status:
+            return
+        logger.info(f"Task {task.name} status: {status.value}")
+        task.status = status
+        if status not in (StatusCode.RUNNING, StatusCode.STOPPED):
+            task.end_time = time.time()
+        self.tasks.mark_changed(task)
+
     def check_running_tasks(self):
-        for task_id in self.tasks.keys():
-            task = self.tasks[task_id]
-            if task.status == StatusCode.RUNNING:
-                enginetask = self.engine.get_task(task.id)
-                logger.info(f"Task {task.name} status: {enginetask['status']}")
-                task.status = StatusCode(enginetask["status"])
-            elif task.status == StatusCode.COMPLETED:
-                logger.info(f"Task {task.name} completed")
-                task.end_time = time.time()
-            elif task.status == StatusCode.FAILED:
-                logger.info(f"Task {task.name} failed")
-                if hasattr(task, "end_time"):
-                    if (
-                        task.times_failed < 3
-                        and time.time() - task.end_time > self.resubmit_wait_time
-                    ):
-                        task.times_failed += 1
-                        task.status = StatusCode.PENDING
-            self.tasks[task_id] = task
+        """Update the status of active tasks.
+
+        Notifications pushed by the engine are applied first. Other changes
+        are fetched from the engine in a single call. Only tasks waiting to be
+        retried are checked otherwise.
+        """
+        while True:
+            try:
+                task_id, status = self.notifications.get_nowait()
+            except queue.Empty:
+                break
+            self.update_task_status(task_id, status)
+
+        changes = self.engine.poll_changes(self.engine_seq)
+        self.engine_seq = changes["seq"]
+        for enginetask in changes["tasks"]:
+            self.update_task_status(enginetask["id"], StatusCode(enginetask["status"]))
+
+        for task in self.tasks.active_tasks():
+            if task.status == StatusCode.FAILED:
+                if task.times_failed >= 3:
+                    logger.info(f"Task {task.name} failed")
+                    self.tasks.deactivate(task)
+                elif time.time() - task.end_time > self.resubmit_wait_time:
+                    task.times_failed += 1
+                    task.status = StatusCode.PENDING
+                    self.tasks.mark_changed(task)
 
     def start(
         self,
@@ -204,7 +303,11 @@ class Controller:
         self.stop_event = Event()
         self.engine_stop_event = Event()
 
-        engine = Engine(self.executables_folder)
+        engine = Engine(
+            self.executables_folder,
+            wakeup=self.wakeup,
+            controller_address=f"http://localhost:{self.controller_port}/RPC2",
+        )
         self.engine_process = Process(
             target=engine.start,
             args=(
@@ -222,7 +325,6 @@ class Controller:
             args=(
                 self.queue,
                 self.stop_event,
-                self.tasks,
             ),
         )
         self.process.start()
@@ -234,7 +336,7 @@ class Controller:
             args=(
                 self.hostname,
                 self.info_api_port,
-                self.tasks,
+                self.api_connection,
             ),
         )
         self.api_process.start()
@@ -291,7 +393,7 @@ class Controller:
         logger.info("Stopped")
         self.status["controller_status"] = "stopped"
 
-    def main_loop(self, queue, stop_event, tasks):
+    def main_loop(self, queue, stop_event):
         """The controller main loop periodically checks for tasks in the queue
         and runs them when resources are available.
 
@@ -301,30 +403,33 @@ class Controller:
         sys.stdout = os.fdopen(sys.stdout.fileno(), "w", buffering=1)
         sys.stderr = os.fdopen(sys.stderr.fileno(), "w", buffering=1)
         self.queue = queue
-        self.tasks = tasks
         self.start_rpc_server(self.controller_port)
         self.connect_engine()
 
         while not stop_event.is_set():
             try:
                 logger.info("main loop")
-                time.sleep(self.scheduling_interval)
+                self.wait_for_cycle(stop_event)
                 self.check_running_tasks()
 
                 resources = self.resources_available()
 
-                queue_dict = self.queue.dict()
+                queue_dict = self.sync_queue()
                 task_placement = self.algorithm.next_tasks(queue_dict, resources)
 
                 if task_placement is None:
+                    self.tasks.publish()
                     continue
 
                 for task_id, placement in task_placement.items():
-                    self.execute_task(queue_dict[task_id], placement)
-                    self.tasks[task_id] = queue_dict[task_id]
-                    self.tasks[task_id].execution_timestamp = time.time()
-                    self.tasks[task_id].execution_nodes = placement.keys()
+                    task = queue_dict[task_id]
+                    self.execute_task(task, placement)
+                    task.execution_timestamp = time.time()
+                    task.execution_nodes = list(placement.keys())
+                    self.tasks.add(task)
                     self.queue.delete_id(task_id)
+                    self.queue_mirror.pop(task_id, None)
+                self.tasks.publish()
 
             except KeyboardInterrupt:
                 logger.info("Keyboard interrupt")
@@ -348,18 +453,26 @@ class Controller:
         """
         pass
 
+    def notify(self, task_id, status):
+        """Queue a task status notification for the main loop and start a
+        scheduling cycle. Called from the RPC server thread.
+        """
+        self.notifications.put((task_id, status))
+        self.wakeup.set()
+        return True
+
     def task_stopped(self, task_id):
         """Receive notification from the engine that a task has been stopped."""
-        for task_id in self.tasks.keys():
-            task = self.tasks[task_id]
-            if task.task_id == task_id:
-                task.status = StatusCode.PENDING
-                break
+        return self.notify(task_id, StatusCode.STOPPED)
 
     def task_complete(self, task_id):
         """Receive notification from the engine that a task has been finished."""
-        for task_id in self.tasks.keys():
-            task = self.tasks[task_id]
-            if task.task_id == task_id:
-                task.status = StatusCode.COMPLETED
-                break
+        return self.notify(task_id, StatusCode.COMPLETED)
+
+    def task_failed(self, task_id):
+        """Receive notification from the engine that a task has failed."""
+        return self.notify(task_id, StatusCode.FAILED)
+
+    def task_killed(self, task_id):
+        """Receive notification from the engine that a task has been killed."""
+        return self.notify(task_id, StatusCode.KILLED)
@@ -209,13 +209,15 @@ class TaskManager:
             requires_file += len(task.file_pattern)
             if requires_file > 0:
                 batches = task.batch_files()
+                scheduler_tasks = []
                 for batch in batches:
                     logger.info(
                         f"Queueing {task.name} with a batch of {len(batch)} files"
                     )
-                    self.queue.push(SchedulerTask(task, batch))
+                    scheduler_tasks.append(SchedulerTask(task, batch))
                     task.mark_used_files(batch)
                     task.index += 1
+                self.queue.push_many(scheduler_tasks)
 
             else:
                 if task.replicas > 0:
@@ -1,48 +1,261 @@
+import collections
+import hashlib
+import heapq
+import itertools
+import json
 import multiprocessing
+import threading
+from multiprocessing.managers import BaseManager
 
 from .scheduler_task import SchedulerTask
 
 
+def parameter_fingerprint(parameters):
+    """Return a short hashable fingerprint of a task parameter dictionary."""
+    if parameters is None:
+        return None
+    encoded = json.dumps(parameters, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+class TaskHeap:
+    def __init__(self, max_changes=100000):
+        """Priority queue of tasks backed by a heap and an index by task id.
+
+        The heap lives in the manager process, so that pushing or deleting a
+        task only transfers that task between processes. Deleted tasks are
+        left in the heap and skipped when popped. The heap is rebuilt once
+        more than half of it consists of deleted entries.
+
+        The number of queued tasks is also counted by task name and by task
+        name and parameters, so that duplicate and replica checks are O(1).
+
+        Every change increments a version number and is recorded in a bounded
+        change log. A reader can ask for the changes since the version it last
+        saw and only receive the tasks added or updated after it.
+        """
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.name_counts = collections.Counter()
+        self.replica_counts = collections.Counter()
+
+        self.version = 0
+        self.reset_version = 0
+        self.changes = collections.deque(maxlen=max_changes)
+
+    def _record(self, task_id, change):
+        self.version += 1
+        self.changes.append((self.version, task_id, change))
+
+    def _count(self, task, change):
+        key = (task.name, parameter_fingerprint(getattr(task, "parameters", None)))
+        self.name_counts[task.name] += change
+        self.replica_counts[key] += change
+        if self.name_counts[task.name] <= 0:
+            del self.name_counts[task.name]
+        if self.replica_counts[key] <= 0:
+            del self.replica_counts[key]
+
+    def _push(self, task):
+        if task.id in self.entries:
+            self._delete(task.id, record=False)
+            self._record(task.id, "updated")
+        else:
+            self._record(task.id, "added")
+        # Highest priority first. Within a priority, the newest task first.
+        entry = [-task.priority, -next(self.counter), task]
+        self.entries[task.id] = entry
+        heapq.heappush(self.heap, entry)
+        self._count(task, 1)
+
+    def _delete(self, task_id, record=True):
+        entry = self.entries.pop(task_id, None)
+        if entry is None:
+            return None
+        if record:
+            self._record(task_id, "removed")
+        task = entry[2]
+        entry[2] = None
+        self._count(task, -1)
+        if len(self.heap) > 2 * len(self.entries) + 16:
+            self.heap = list(self.entries.values())
+            heapq.heapify(self.heap)
+        return task
+
+    def push(self, task):
+        with self.lock:
+            self._push(task)
+
+    def push_many(self, tasks):
+        with self.lock:
+            for task in tasks:
+                self._push(task)
+
+    def pop(self):
+        with self.lock:
+            while self.heap:
+                entry = heapq.heappop(self.heap)
+                task = entry[2]
+                if task is not None:
+                    del self.entries[task.id]
+                    self._count(task, -1)
+                    self._record(task.id, "removed")
+                    return task
+            raise IndexError("pop from empty queue")
+
+    def get(self, task_id):
+        entry = self.entries.get(task_id)
+        return None if entry is None else entry[2]
+
+    def get_all(self):
+        with self.lock:
+            entries = sorted(
+                self.entries.values(), key=lambda e: (e[0], e[1]), reverse=True
+            )
+            self.heap = []
+            self.entries = {}
+            self.name_counts.clear()
+            self.replica_counts.clear()
+            self.version += 1
+            self.reset_version = self.version
+            self.changes.clear()
+            return [entry[2] for entry in entries]
+
+    def delete_id(self, task_id):
+        with self.lock:
+            return self._delete(task_id)
+
+    def dict(self):
+        with self.lock:
+            return {task_id: entry[2] for task_id, entry in self.entries.items()}
+
+    def changes_since(self, version):
+        """Return the tasks added, updated and removed after a given version.
+
+        If the change log no longer reaches back to the version, all queued
+        tasks are returned as added, with reset set to True.
+        """
+        with self.lock:
+            oldest = self.changes[0][0] - 1 if self.changes else self.version
+            if version < max(oldest, self.reset_version) or version > self.version:
+                return {
+                    "version": self.version,
+                    "reset": True,
+                    "added": {task_id: e[2] for task_id, e in self.entries.items()},
+                    "updated": {},
+                    "removed": [],
+                }
+
+            # Find the first change of each task after the given version
+            first_change = {}
+            for change_version, task_id, change in reversed(self.changes):
+                if change_version <= version:
+                    break
+                first_change[task_id] = change
+
+            added, updated, removed = {}, {}, []
+            for task_id, change in first_change.items():
+                entry = self.entries.get(task_id)
+                if entry is not None:
+                    if change == "added":
+                        added[task_id] = entry[2]
+                    else:
+                        updated[task_id] = entry[2]
+                elif change != "added":
+                    removed.append(task_id)
+
+            return {
+                "version": self.version,
+                "reset": False,
+                "added": added,
+                "updated": updated,
+                "removed": removed,
+            }
+
+    def length(self):
+        return len(self.entries)
+
+    def contains_name(self, name):
+        return self.name_counts[name] > 0
+
+    def count_replicas(self, name, parameters):
+        return self.replica_counts[(name, parameter_fingerprint(parameters))]
+
+
+class QueueManager(BaseManager):
+    pass
+
+
+QueueManager.register("TaskHeap", TaskHeap)
+
+
 class TaskQueue:
     def __init__(self):
-        """Simple implementation of the task queue. Allows getting all tasks
-        ordered by priority.
+        """Task queue shared between the task manager and the controller.
+        Allows getting all tasks ordered by priority.
+
+        Tasks are stored in a heap in a manager process. Push and pop are
+        O(log n) and lookup by id is O(1).
         """
-        self.manager = multiprocessing.Manager()
-        self.tasks = self.manager.list()
+        self.manager = QueueManager()
+        self.manager.start()
+        self.tasks = self.manager.TaskHeap()
+
+        # Set whenever a task is pushed, so that an event driven controller
+        # can start a scheduling cycle without waiting for the full interval.
+        self.wakeup = multiprocessing.Event()
 
     def push(self, task):
         assert isinstance(task, SchedulerTask)
-        self.tasks.append(task)
-        self.tasks[:] = sorted(self.tasks, key=lambda task: task.priority)
+        self.tasks.push(task)
+        self.wakeup.set()
+
+    def push_many(self, tasks):
+        """Push a list of tasks in a single call to the manager process."""
+        for task in tasks:
+            assert isinstance(task, SchedulerTask)
+        if tasks:
+            self.tasks.push_many(tasks)
+            self.wakeup.set()
 
     def pop(self):
+        """Remove and return the task with the highest priority."""
         return self.tasks.pop()
 
+    def get(self, task_id):
+        """Return a queued task by id, or None if it is not in the queue."""
+        return self.tasks.get(task_id)
+
     def get_all(self):
-        tasks_copy = list(self.tasks)
-        self.tasks[:] = []
-        return tasks_copy
+        """Remove and return all tasks, ordered by increasing priority."""
+        return self.tasks.get_all()
 
     def delete_id(self, task_id):
-        for i, task in enumerate(self.tasks):
-            if task.id == task_id:
-                self.tasks[:] = self.tasks[:i] + self.tasks[i + 1 :]
-                break
+        self.tasks.delete_id(task_id)
 
     def dict(self):
-        return {task.id: task for task in self.tasks}
+        return self.tasks.dict()
+
+    def changes_since(self, version):
+        """Return the changes to the queue after the given version.
+
+        Returns a dictionary with the current "version", the "added" and
+        "updated" tasks by id and a list of "removed" task ids. If "reset" is
+        True, the queue could not provide a delta and "added" contains all
+        queued tasks.
+        """
+        return self.tasks.changes_since(version)
 
     def __len__(self):
-        return len(self.tasks)
+        return self.tasks.length()
 
     def __contains__(self, task):
-        return task.name in [t.name for t in self.tasks]
+        return self.tasks.contains_name(task.name)
 
     def n_replicas(self, task):
-        replicas = [t for t in self.tasks if t.name == task.name]
-        replicas = [r for r in replicas if r.parameters == task.parameters]
-        return len(replicas)
+        return self.tasks.count_replicas(task.name, getattr(task, "parameters", None))
 
     def export_tasks(self):
         return {}
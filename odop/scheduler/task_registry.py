@@ -0,0 +1,133 @@
+"""Task registry owned by the controller process.
+
+The controller keeps the authoritative table of tasks it has scheduled in
+process memory. Changed tasks are sent as compact summaries through a pipe to
+the API process, which keeps a read only copy in a TaskSnapshot.
+"""
+
+import threading
+
+from odop.common import create_logger
+from odop.engine.engine import StatusCode
+
+logger = create_logger("controller")
+
+# Statuses of tasks that need to be checked by the controller every cycle
+ACTIVE_STATUSES = (StatusCode.RUNNING, StatusCode.STOPPED, StatusCode.FAILED)
+
+
+def task_summary(task):
+    """Return a picklable summary of a scheduler task for the API."""
+    summary = {
+        "name": task.name,
+        "id": task.id,
+        "task_id": getattr(task, "task_id", None),
+        "index": task.index,
+        "status": task.status.value,
+        "pid": task.pid,
+        "times_failed": task.times_failed,
+    }
+    for key in ["parameters", "start_time", "end_time"]:
+        if hasattr(task, key):
+            summary[key] = getattr(task, key)
+    return summary
+
+
+class TaskRegistry:
+    def __init__(self, connection=None):
+        """Table of scheduled tasks by id.
+
+        Only active tasks (running, stopped or waiting to be retried) are
+        checked each cycle, so the cost of a cycle does not grow with the
+        number of finished tasks.
+
+        Parameters:
+        ------------
+        connection: multiprocessing.connection.Connection
+            Optional sending end of a pipe. Changed tasks are published to it.
+        """
+        self.tasks = {}
+        self.active = set()
+        self.changed = set()
+        self.connection = connection
+
+    def add(self, task):
+        """Add a task that has been sent to the engine."""
+        self.tasks[task.id] = task
+        self.mark_changed(task)
+
+    def mark_changed(self, task):
+        """Mark a task to be published and update the active set."""
+        self.changed.add(task.id)
+        if task.status in ACTIVE_STATUSES:
+            self.active.add(task.id)
+        else:
+            self.active.discard(task.id)
+
+    def deactivate(self, task):
+        """Stop checking a task that will not change any more."""
+        self.active.discard(task.id)
+
+    def active_tasks(self):
+        return [self.tasks[task_id] for task_id in self.active]
+
+    def get(self, task_id):
+        return self.tasks.get(task_id)
+
+    def publish(self):
+        """Send summaries of changed tasks through the connection."""
+        if not self.changed:
+            return
+        summaries = {
+            task_id: task_summary(self.tasks[task_id]) for task_id in self.changed
+        }
+        self.changed = set()
+        if self.connection is None:
+            return
+        try:
+            self.connection.send(summaries)
+        except OSError:
+            logger.info("Task status reader is not available")
+            self.connection = None
+
+    def __getitem__(self, task_id):
+        return self.tasks[task_id]
+
+    def __contains__(self, task_id):
+        return task_id in self.tasks
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def keys(self):
+        return self.tasks.keys()
+
+    def values(self):
+        return self.tasks.values()
+
+
+class TaskSnapshot:
+    def __init__(self, connection):
+        """Read only copy of the task registry, updated from a pipe in a
+        background thread.
+
+        Parameters:
+        ------------
+        connection: multiprocessing.connection.Connection
+            Receiving end of the pipe the registry publishes to.
+        """
+        self.tasks = {}
+        self.connection = connection
+        self.thread = threading.Thread(target=self.receive, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def receive(self):
+        """Apply task summaries until the controller closes the pipe."""
+        while True:
+            try:
+                summaries = self.connection.recv()
+            except (EOFError, OSError):
+                break
+            self.tasks.update(summaries)
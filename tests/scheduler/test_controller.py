@@ -1,3 +1,11 @@
+import threading
+import time
+
+from odop.scheduler.controller import Controller
+from odop.scheduler.scheduler_task import SchedulerTask
+from odop.scheduler.task_queue import TaskQueue
+
+
 class DummyTask:
     def __init__(self, priority=0):
         self.name = ""
@@ -17,3 +25,27 @@ class DummyTask:
 
         self.task_id = None
         self.status = ""
+
+
+def test_event_driven_wakeup():
+    queue = TaskQueue()
+    config = {"event_driven": True, "frequency": 10}
+    controller = Controller(queue, {}, config)
+    stop_event = threading.Event()
+
+    threading.Timer(0.1, queue.push, args=(SchedulerTask(DummyTask()),)).start()
+    start = time.time()
+    controller.wait_for_cycle(stop_event)
+    assert time.time() - start < 5
+    assert not queue.wakeup.is_set()
+
+
+def test_interval_upper_bound():
+    queue = TaskQueue()
+    config = {"event_driven": True, "frequency": 0.2}
+    controller = Controller(queue, {}, config)
+    stop_event = threading.Event()
+
+    start = time.time()
+    controller.wait_for_cycle(stop_event)
+    assert 0.15 < time.time() - start < 5
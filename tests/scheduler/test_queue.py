@@ -81,3 +81,74 @@ def test_queue_multiprocess():
     p2.join()
 
     assert len(queue) == 0
+
+
+def test_pop_and_delete():
+    queue = TaskQueue()
+    task1 = SchedulerTask(DummyTask(1))
+    task2 = SchedulerTask(DummyTask(5))
+    task3 = SchedulerTask(DummyTask(3))
+    queue.push_many([task1, task2, task3])
+    assert len(queue) == 3
+    assert queue.get(task3.id).priority == 3
+
+    queue.delete_id(task2.id)
+    assert len(queue) == 2
+    assert queue.get(task2.id) is None
+    assert set(queue.dict().keys()) == {task1.id, task3.id}
+
+    assert queue.pop().id == task3.id
+    assert queue.pop().id == task1.id
+    assert len(queue) == 0
+
+
+def test_replica_counts():
+    queue = TaskQueue()
+    task1 = SchedulerTask(DummyTask(1), batch=["a"])
+    task2 = SchedulerTask(DummyTask(1), batch=["a"])
+    task3 = SchedulerTask(DummyTask(1), batch=["b"])
+    queue.push_many([task1, task2, task3])
+
+    assert task1 in queue
+    assert queue.n_replicas(task1) == 2
+    assert queue.n_replicas(task3) == 1
+
+    queue.delete_id(task1.id)
+    assert queue.n_replicas(task2) == 1
+    queue.pop()
+    queue.pop()
+    assert task1 not in queue
+
+
+def test_changes_since():
+    queue = TaskQueue()
+    task1 = SchedulerTask(DummyTask(1))
+    task2 = SchedulerTask(DummyTask(2))
+    task3 = SchedulerTask(DummyTask(3))
+
+    changes = queue.changes_since(-1)
+    assert changes["reset"]
+    assert changes["added"] == {}
+
+    queue.push_many([task1, task2])
+    version = changes["version"]
+    changes = queue.changes_since(version)
+    assert not changes["reset"]
+    assert set(changes["added"].keys()) == {task1.id, task2.id}
+
+    version = changes["version"]
+    queue.delete_id(task1.id)
+    queue.push(task3)
+    queue.delete_id(task3.id)
+    task2.priority = 5
+    queue.push(task2)
+    changes = queue.changes_since(version)
+    assert changes["added"] == {}
+    assert list(changes["updated"].keys()) == [task2.id]
+    assert changes["updated"][task2.id].priority == 5
+    assert changes["removed"] == [task1.id]
+
+    changes = queue.changes_since(changes["version"])
+    assert changes["added"] == {}
+    assert changes["updated"] == {}
+    assert changes["removed"] == []
@@ -0,0 +1,49 @@
+import multiprocessing
+import time
+
+from odop.engine.engine import StatusCode
+from odop.scheduler.scheduler_task import SchedulerTask
+from odop.scheduler.task_registry import TaskRegistry, TaskSnapshot
+
+
+class DummyTask:
+    def __init__(self, priority=0):
+        self.name = "dummy"
+        self.time = 1
+        self.memory = 0
+        self.nodes = "any"
+        self.ranks_per_node = "any"
+        self.ranks = "any"
+        self.cpus_per_rank = "any"
+        self.cpus = 1
+        self.disk_limit = 0
+        self.index = 0
+
+        self.execution_type = ""
+        self.priority = priority
+        self.filename = None
+
+
+def test_registry_publish():
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    registry = TaskRegistry(writer)
+    snapshot = TaskSnapshot(reader)
+    snapshot.start()
+
+    task = SchedulerTask(DummyTask())
+    task.status = StatusCode.RUNNING
+    registry.add(task)
+    assert registry.active_tasks() == [task]
+    registry.publish()
+
+    task.status = StatusCode.COMPLETED
+    registry.mark_changed(task)
+    assert registry.active_tasks() == []
+    registry.publish()
+
+    for _ in range(100):
+        if snapshot.tasks.get(task.id, {}).get("status") == "completed":
+            break
+        time.sleep(0.01)
+    assert snapshot.tasks[task.id]["status"] == "completed"
+    assert snapshot.tasks[task.id]["name"] == task.name
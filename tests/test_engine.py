@@ -245,9 +245,11 @@ def test_engine_run(script_task, python_task, failing_task):
     assert engine.tasks[2].status == StatusCode.FAILED
 
 
-def test_task_manager_format_mpi_command_slurm(executables_folder, python_task):
+def test_task_manager_format_mpi_command_slurm(
+    executables_folder, python_task, monkeypatch
+):
     # mock environment to add "SLURM_JOB_ID"
-    os.environ["SLURM_JOB_ID"] = "1234"
+    monkeypatch.setenv("SLURM_JOB_ID", "1234")
     _, task = python_task
     task_manager = TaskManager(task, executables_folder)
     task_manager.nodes = 2
@@ -265,9 +267,8 @@ def test_task_manager_format_mpi_command_slurm(executables_folder, python_task):
     command = task_manager.format_mpi_command(base_command, placement)
     assert (
         command
-        == "srun --overlap  --nice=20 -N 2 --mem=0 --ntasks-per-node=2 --cpus-per-task=3 --nodelist node1,node2 command"
+        == "srun --overlap --cpu-bind=cores --nice=20 -N 2 --mem=0 --ntasks-per-node=2 --cpus-per-task=3 --nodelist node1,node2 command"
     )
-    os.environ.pop("SLURM_JOB_ID")
 
 
 def test_task_manager_format_mpi_command(executables_folder, python_task):
@@ -382,8 +383,10 @@ def test_task_manager_command_single_rank(executables_folder, python_task):
     assert command_passed == f"ssh node1 'cd {working_dir}; command'"
 
 
-def test_task_manager_command_single_slurm(executables_folder, python_task):
-    os.environ["SLURM_JOB_ID"] = "1234"
+def test_task_manager_command_single_slurm(
+    executables_folder, python_task, monkeypatch
+):
+    monkeypatch.setenv("SLURM_JOB_ID", "1234")
 
     _, task = python_task
     task_manager = TaskManager(task, executables_folder)
@@ -404,5 +407,37 @@ def test_task_manager_command_single_slurm(executables_folder, python_task):
 
     assert (
         command_passed
-        == "srun --overlap  --nice=20 -N 1 --mem=0 --ntasks-per-node=1 --cpus-per-task=6 --nodelist node1 command"
+        == "srun --overlap --cpu-bind=cores --nice=20 -N 1 --mem=0 --ntasks-per-node=1 --cpus-per-task=6 --nodelist node1 command"
     )
+
+
+def test_engine_poll_changes(script_task):
+    executables_folder, task = script_task
+    engine = Engine(executables_folder)
+
+    my_hostname = os.uname().nodename
+    engine.run(task.__dict__, {my_hostname: {"cpus": [0], "ranks": 1}})
+    changes = engine.poll_changes(0)
+    assert [t["status"] for t in changes["tasks"]] == ["running"]
+
+    seq = changes["seq"]
+    assert engine.poll_changes(seq)["tasks"] == []
+
+    engine.tasks[0].process.wait()
+    engine.update()
+    changes = engine.poll_changes(seq)
+    assert [t["status"] for t in changes["tasks"]] == ["completed"]
+    assert changes["seq"] > seq
+
+
+def test_engine_notifications(script_task):
+    executables_folder, task = script_task
+    engine = Engine(executables_folder, controller_address="http://localhost:1/RPC2")
+
+    my_hostname = os.uname().nodename
+    engine.run(task.__dict__, {my_hostname: {"cpus": [0], "ranks": 1}})
+    assert engine.notifications.empty()
+
+    engine.tasks[0].process.wait()
+    engine.update()
+    assert engine.notifications.get_nowait() == ("task_complete", task.id)